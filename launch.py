@@ -179,6 +179,7 @@ def start_experiment(args):
         model_args['curiosity_kwargs']['prediction_beta'] = args.prediction_beta
         model_args['curiosity_kwargs']['drop_probability'] = args.drop_probability
         model_args['curiosity_kwargs']['gamma'] = args.discount
+        model_args['curiosity_kwargs']['jit_models'] = args.jit_models
         model_args['curiosity_kwargs']['device'] = args.sample_mode
 
     if args.env in _MUJOCO_ENVS:
@@ -70,7 +70,8 @@ class PolicyGradientAlgo(RlAlgorithm):
             reward += intrinsic_rewards
             self.intrinsic_rewards = intrinsic_rewards.clone().data.numpy()
         elif self.curiosity_type == 'rnd':
-            intrinsic_rewards, _ = self.agent.curiosity_step(self.curiosity_type, samples.env.next_observation.clone(), done.clone())
+            # RND only uses the newest frame, don't copy/transfer the rest of the stack
+            intrinsic_rewards, _ = self.agent.curiosity_step(self.curiosity_type, samples.env.next_observation[:, :, -1:].clone(), done.clone())
             reward += intrinsic_rewards
             self.intrinsic_rewards = intrinsic_rewards.clone().data.numpy()
 
@@ -100,7 +100,7 @@ class PPO(PolicyGradientAlgo):
             agent_curiosity_inputs = buffer_to(agent_curiosity_inputs, device=self.agent.device)
         elif self.curiosity_type == 'rnd':
             agent_curiosity_inputs = RndAgentCuriosityInputs(
-                next_observation=samples.env.next_observation.clone(),
+                next_observation=samples.env.next_observation[:, :, -1:].clone(), # RND only uses the newest frame
                 valid=valid
             )
             agent_curiosity_inputs = buffer_to(agent_curiosity_inputs, device=self.agent.device)
@@ -6,9 +6,12 @@ from __future__ import print_function
 
 import os
 import sys
+import math
+import pathlib
 
 import abc
 import time
+import atexit
 import numbers
 import gym
 from gym import spaces
@@ -16,53 +19,48 @@ from gym import logger
 from gym.utils import seeding
 
 import numpy as np
-from scipy.stats import entropy
 from collections import namedtuple
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 
 from rlpyt.samplers.collections import TrajInfo
 import matplotlib.pyplot as plt
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+try:
+    from . import _paint
+except ImportError:
+    _paint = None
+
+# Repo root that heatmap directories are created under, resolved once per process.
+_REPO_ROOT = next((p for p in pathlib.Path(os.path.abspath(__file__)).parents
+                   if p.name == 'curiosity_baselines'), None)
+
 EnvInfo = namedtuple("EnvInfo", ["visitation_frequency", "first_visit_time", "traj_done"])
 
 class PycolabTrajInfo(TrajInfo):
     """TrajInfo class for use with Pycolab Env, to store visitation
-    frequencies and any other custom metrics. Has room to store up to 5 sprites
-    currently, but can be expanded. Can store fewer automatically as well. """
+    frequencies and any other custom metrics. Has room to store up to 8 sprites
+    currently, but can be expanded. Can store fewer automatically as well.
+
+    Per-object stats are accumulated in fixed length arrays while stepping and
+    only written out to the logged ``visit_freq_a``...``percent_eps_h`` fields
+    when the trajectory terminates. """
+
+    _object_slots = 'abcdefgh'
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.visit_freq_a = 0
-        self.visit_freq_b = 0
-        self.visit_freq_c = 0
-        self.visit_freq_d = 0
-        self.visit_freq_e = 0
-        self.visit_freq_f = 0
-        self.visit_freq_g = 0
-        self.visit_freq_h = 0
-        self.first_visit_a = 500
-        self.first_visit_b = 500
-        self.first_visit_c = 500
-        self.first_visit_d = 500
-        self.first_visit_e = 500
-        self.first_visit_f = 500
-        self.first_visit_g = 500
-        self.first_visit_h = 500
-        self.num_eps_a = 0
-        self.num_eps_b = 0
-        self.num_eps_c = 0
-        self.num_eps_d = 0
-        self.num_eps_e = 0
-        self.num_eps_f = 0
-        self.num_eps_g = 0
-        self.num_eps_h = 0
-        self.percent_eps_a = 0
-        self.percent_eps_b = 0
-        self.percent_eps_c = 0
-        self.percent_eps_d = 0
-        self.percent_eps_e = 0
-        self.percent_eps_f = 0
-        self.percent_eps_g = 0
-        self.percent_eps_h = 0
+        n = len(self._object_slots)
+        self._visit_freq = np.zeros(n, dtype=np.int32)
+        self._first_visit = np.full(n, 500, dtype=np.int32)
+        self._num_eps = np.zeros(n, dtype=np.int32)
+        self._percent_eps = np.zeros(n)
+        self._write_object_stats()
         self.visitation_entropy = 0
 
     def step(self, observation, action, reward_ext, done, agent_info, env_info):
@@ -73,68 +71,36 @@ class PycolabTrajInfo(TrajInfo):
         num_obj_eps = getattr(env_info, 'num_obj_eps', None)
 
         if visitation_frequency is not None and first_visit_time is not None:
-            if len(visitation_frequency) >= 1:
-                if first_visit_time[0] == 500 and visitation_frequency[0] == 1:
-                    self.first_visit_a = self.Length
-                self.visit_freq_a = visitation_frequency[0]
-                if done == True:
-                    self.num_eps_a = num_obj_eps[0]
-                    self.percent_eps_a = self.num_eps_a/episodes
-            if len(visitation_frequency) >= 2:
-                if first_visit_time[1] == 500 and visitation_frequency[1] == 1:
-                    self.first_visit_b = self.Length
-                self.visit_freq_b = visitation_frequency[1]
-                if done == True:
-                    self.num_eps_b = num_obj_eps[1]
-                    self.percent_eps_b = self.num_eps_b/episodes
-            if len(visitation_frequency) >= 3:
-                if first_visit_time[2] == 500 and visitation_frequency[2] == 1:
-                    self.first_visit_c = self.Length
-                self.visit_freq_c = visitation_frequency[2]
-                if done == True:
-                    self.num_eps_c = num_obj_eps[2]
-                    self.percent_eps_c = self.num_eps_c/episodes
-            if len(visitation_frequency) >= 4:
-                if first_visit_time[3] == 500 and visitation_frequency[3] == 1:
-                    self.first_visit_d = self.Length
-                self.visit_freq_d = visitation_frequency[3]
-                if done == True:
-                    self.num_eps_d = num_obj_eps[3]
-                    self.percent_eps_d = self.num_eps_d/episodes
-            if len(visitation_frequency) >= 5:
-                if first_visit_time[4] == 500 and visitation_frequency[4] == 1:
-                    self.first_visit_e = self.Length
-                self.visit_freq_e = visitation_frequency[4]
-                if done == True:
-                    self.num_eps_e = num_obj_eps[4]
-                    self.percent_eps_e = self.num_eps_e/episodes
-            if len(visitation_frequency) >= 6:
-                if first_visit_time[5] == 500 and visitation_frequency[5] == 1:
-                    self.first_visit_f = self.Length
-                self.visit_freq_f = visitation_frequency[5]
-                if done == True:
-                    self.num_eps_f = num_obj_eps[5]
-                    self.percent_eps_f = self.num_eps_f/episodes
-            if len(visitation_frequency) >= 7:
-                if first_visit_time[6] == 500 and visitation_frequency[6] == 1:
-                    self.first_visit_g = self.Length
-                self.visit_freq_g = visitation_frequency[6]
-                if done == True:
-                    self.num_eps_g = num_obj_eps[6]
-                    self.percent_eps_g = self.num_eps_g/episodes
-            if len(visitation_frequency) >= 8:
-                if first_visit_time[7] == 500 and visitation_frequency[7] == 1:
-                    self.first_visit_h = self.Length
-                self.visit_freq_h = visitation_frequency[7]
-                if done == True:
-                    self.num_eps_h = num_obj_eps[7]
-                    self.percent_eps_h = self.num_eps_h/episodes
+            n = min(len(visitation_frequency), len(self._object_slots))
+            vf = np.asarray(visitation_frequency[:n])
+            fvt = np.asarray(first_visit_time[:n])
+            self._first_visit[:n][(fvt == 500) & (vf == 1)] = self.Length
+            self._visit_freq[:n] = vf
+            if done:
+                self._num_eps[:n] = num_obj_eps[:n]
+                self._percent_eps[:n] = self._num_eps[:n] / episodes
 
         super().step(observation, action, reward_ext, done, agent_info, env_info)
 
+    def terminate(self):
+        self._write_object_stats()
+        return super().terminate()
+
+    def _write_object_stats(self):
+        """Copy the per-object arrays into the named (logged) fields."""
+        for stat, values in (('visit_freq', self._visit_freq),
+                             ('first_visit', self._first_visit),
+                             ('num_eps', self._num_eps),
+                             ('percent_eps', self._percent_eps)):
+            for char, value in zip(self._object_slots, values.tolist()):
+                self['{}_{}'.format(stat, char)] = value
+
 def _repeat_axes(x, factor, axis=[0, 1]):
     """Repeat np.array tiling it by `factor` on all axes.
 
+    The repeats are expressed as a single broadcast, so only the final array
+    is allocated (rather than one intermediate per repeated axis).
+
     Args:
         x: input array.
         factor: number of repeats per axis.
@@ -143,11 +109,78 @@ def _repeat_axes(x, factor, axis=[0, 1]):
     Returns:
         repeated array with shape `[x.shape[ax] * factor for ax in axis]`
     """
-    x_ = x
-    for ax in axis:
-        x_ = np.repeat(
-            x_, factor, axis=ax)
-    return x_
+    if factor == 1:
+        return np.array(x)
+    expanded, broadcast, repeated = [], [], []
+    for ax, size in enumerate(x.shape):
+        if ax in axis:
+            expanded += [size, 1]
+            broadcast += [size, factor]
+            repeated.append(size * factor)
+        else:
+            expanded.append(size)
+            broadcast.append(size)
+            repeated.append(size)
+    x_ = np.broadcast_to(np.reshape(x, expanded), broadcast)
+    return x_.reshape(repeated)
+
+
+def _heatmap_visit(heatmap, r, c):
+    """Increment heatmap[r, c] and return the change this makes to the sum of
+    count*log(count) over the heatmap, which the entropy is derived from."""
+    count = heatmap[r, c]
+    delta = (count + 1) * math.log(count + 1)
+    if count > 0:
+        delta -= count * math.log(count)
+    heatmap[r, c] = count + 1
+    return delta
+
+if njit is not None:
+    _heatmap_visit = njit(cache=True)(_heatmap_visit)
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _fill_mask_state(curtains, is_object, out, touched):
+        """Copy the layer curtains into the (K, H, W) state array `out` and flag
+        in `touched` the object layers present on the board, in one pass."""
+        for i in range(len(curtains)):
+            curtain = curtains[i]
+            hit = False
+            for r in range(curtain.shape[0]):
+                for c in range(curtain.shape[1]):
+                    v = curtain[r, c]
+                    out[i, r, c] = v
+                    hit |= v
+            touched[i] = hit and is_object[i]
+else:
+    def _fill_mask_state(curtains, is_object, out, touched):
+        for i, curtain in enumerate(curtains):
+            np.copyto(out[i], curtain)
+            touched[i] = is_object[i] and curtain.any()
+
+
+_heatmap_writer = None
+_heatmap_writer_pid = None
+
+def _get_heatmap_writer():
+    """Single background thread (per process) that writes heatmaps to disk, so
+    samplers don't stall on file IO and PNG encoding. Created lazily and per
+    pid since sampler workers are forked after the env has been used."""
+    global _heatmap_writer, _heatmap_writer_pid
+    if _heatmap_writer is None or _heatmap_writer_pid != os.getpid():
+        _heatmap_writer = ThreadPoolExecutor(max_workers=1)
+        _heatmap_writer_pid = os.getpid()
+        atexit.register(_heatmap_writer.shutdown, wait=True)
+    return _heatmap_writer
+
+def _write_heatmap(path, heatmap):
+    """Save the raw counts (.npy) and a normalized image (.png) of a heatmap."""
+    np.save('{}.npy'.format(path), heatmap)
+    # colour scale up to the L2 norm, same image as dividing by it with vmax=1
+    flat = heatmap.ravel()
+    norm = float(np.sqrt(np.dot(flat, flat))) or 1.0
+    plt.imsave('{}.png'.format(path), heatmap, cmap='afmhot', vmin=0.0, vmax=norm)
 
 
 class PyColabEnv(gym.Env):
@@ -156,6 +189,10 @@ class PyColabEnv(gym.Env):
         'render.modes': ['human', 'rgb_array'],
     }
 
+    # Render order only depends on the game layout, so it is computed once per
+    # (env class, level) and shared between instances.
+    _render_order_cache = {}
+
     def __init__(self,
                  max_iterations,
                  obs_type,
@@ -174,6 +211,12 @@ class PyColabEnv(gym.Env):
 
         You can access the `pycolab.Engine` instance with `env.current_game`.
 
+        The render order comes from a throwaway game, which only the first env
+        of each (class, level) builds. Games that draw from Python's global
+        `random` in `make_game` therefore consume it once per process rather
+        than once per env, so under a fixed seed the second and later envs see
+        a different random sequence than they would if each built its own.
+
         Args:
             max_iterations: maximum number of steps.
             obs_type: type of observation to return.
@@ -201,14 +244,21 @@ class PyColabEnv(gym.Env):
         # At this point, the game would only want to access the random
         # property, although it is set to None initially.
         self.np_random = None
+        self._rng = np.random.default_rng() # reseeded by seed(), used for rendering noise
         self._color_palette = color_palette
-        self._colors = self.make_colors()
-        test_game = self.make_game()
-        test_game.the_plot.info = {}
-        observations, _, _ = test_game.its_showtime()
-        layers = list(observations.layers.keys())
-        not_ordered = list(set(layers) - set(test_game.z_order))
-        self._render_order = list(reversed(not_ordered + test_game.z_order))
+        self._colors = MappingProxyType(self.make_colors()) # fixed for the env's lifetime
+        render_key = (type(self), getattr(self, 'level', None))
+        if render_key not in self._render_order_cache:
+            test_game = self.make_game()
+            test_game.the_plot.info = {}
+            observations, _, _ = test_game.its_showtime()
+            layers = list(observations.layers.keys())
+            not_ordered = list(set(layers) - set(test_game.z_order))
+            self._render_order_cache[render_key] = tuple(reversed(not_ordered + test_game.z_order))
+        self._render_order = list(self._render_order_cache[render_key])
+        self._color_lut = np.array([self._colors.get(key, (0, 0, 0)) for key in self._render_order], np.int16)
+        self._noise_layer = self._render_order.index('@') if '@' in self._render_order else None
+        self._no_noise = np.zeros(0, dtype=np.int16)
 
         # Create the observation space.
         self.obs_type = obs_type
@@ -223,13 +273,17 @@ class PyColabEnv(gym.Env):
         self.visitable_states = visitable_states
 
         self.current_game = None
+        self._player = None
+        self._extrinsic_sprite = None
         self._croppers = []
+        self._has_cropper = False
         self._state = None
 
         self._last_uncropped_observations = None
         self._empty_uncropped_board = None
         self._last_cropped_observations = None
         self._empty_cropped_board = None
+        self._paint_cache = {} # cropped -> (board bytes, painted board)
 
         self._last_reward = None
         self._game_over = False
@@ -238,24 +292,38 @@ class PyColabEnv(gym.Env):
         self.resize_scale = resize_scale
         self.delay = delay
 
-        # Metrics
-        self.visitation_frequency = {char:0 for char in self.objects}
-        self.first_visit_time = {char:500 for char in self.objects}
-        self.visitation_entropy = 0
-        self.num_obj_eps = {char:0 for char in self.objects}
+        # Fixed per env: which layers make up the state, and which are objects
+        self._state_chars = tuple(char for char in self.state_layer_chars if char != ' ')
+        self._objects_set = frozenset(self.objects)
+        self._state_objects = tuple(char for char in self._state_chars if char in self._objects_set)
+        self._state_is_object = np.array([char in self._objects_set for char in self._state_chars], np.bool_)
+        self._state_touched = np.zeros(len(self._state_chars), np.bool_)
+        self._obj_index = {char:i for i, char in enumerate(self.objects)}
+        self._state_obj_index = np.array([self._obj_index.get(char, -1) for char in self._state_chars], np.intp)
+        self._state_object_ids = tuple((char, self._obj_index[char]) for char in self._state_objects)
+        self._extrinsic_fn = self._make_extrinsic_fn()
+
+        # Metrics, indexed like self.objects (see self._obj_index)
+        self.visitation_frequency = np.zeros(len(self.objects), np.int32)
+        self.first_visit_time = np.full(len(self.objects), 500, np.int32)
+        self.num_obj_eps = np.zeros(len(self.objects), np.int32)
 
         # Heatmaps
         self.episodes = 0 # number of episodes run (to determine when to save heatmaps)
         self.heatmap_save_freq = 3 # save heatmaps every 3 episodes
         self.heatmap = np.ones((5, 5)) # stores counts each episode (5x5 is a placeholder)
+        self._heatmap_total = 0 # running sum of heatmap counts
+        self._heatmap_plogp = 0.0 # running sum of count*log(count) over heatmap cells
+        self._heatmap_future = None # last background heatmap write
 
     def pycolab_init(self, logdir, log_heatmaps):
         self.log_heatmaps = log_heatmaps
-        root_path = os.path.abspath(__file__).split('/')[1:]
-        root_path = root_path[:root_path.index('curiosity_baselines')+1]
-        self.heatmap_path = '/' + '/'.join(root_path) + '/' + '/'.join(logdir.split('/')[1:]) + '/heatmaps'
-        if os.path.isdir(self.heatmap_path) == False and log_heatmaps == True:
-            os.makedirs(self.heatmap_path)
+        if _REPO_ROOT is None:
+            raise ValueError('{} is not inside a curiosity_baselines checkout.'.format(__file__))
+        heatmap_path = _REPO_ROOT.joinpath(*logdir.split('/')[1:], 'heatmaps')
+        self.heatmap_path = str(heatmap_path)
+        if log_heatmaps == True:
+            heatmap_path.mkdir(parents=True, exist_ok=True)
 
     @abc.abstractmethod
     def make_game(self):
@@ -320,77 +388,127 @@ class PyColabEnv(gym.Env):
                      uncropped images.
 
         Returns:
-            3D np.array (np.uint32) representing the RGB of the observation
+            3D np.array (np.uint8) representing the RGB of the observation
                 layers.
         """
-        if not cropped:
-            board_shape = self._last_uncropped_observations.board.shape
-        else:
-            board_shape = self._last_cropped_observations.board.shape
-
-        board = np.zeros(list(board_shape) + [3], np.uint32)
-        board_mask = np.zeros(list(board_shape) + [3], np.bool)
-
-        for key in self._render_order:
-
-            color = self._colors.get(key, (0, 0, 0))
-            color = np.reshape(color, [1, 1, -1]).astype(np.uint32)
-
-            # Broadcast the layer to [H, W, C].
-            board_layer_mask = np.array(layers[key])[..., None]
-            board_layer_mask = np.repeat(board_layer_mask, 3, axis=-1)
-            
-            # @ correspond to white noise
-            perturbation = np.zeros(board_layer_mask.shape)
-            if key == '@':
-                h, w = board_layer_mask.shape[:2]
-                perturbation = np.random.randint(-15,15, (h, w, 1))
-
-            # Update the board with the new layer.
-            board = np.where(
-                np.logical_not(board_mask),
-                board_layer_mask * color + perturbation,
-                board)
-
-            # Update the mask.
-            board_mask = np.logical_or(board_layer_mask, board_mask)
+        # Boards with white noise must be repainted every frame, anything else
+        # is fully determined by the (small) character board.
+        if self._noise_layer is None:
+            if not cropped:
+                board_key = self._last_uncropped_observations.board.tobytes()
+            else:
+                board_key = self._last_cropped_observations.board.tobytes()
+            cached = self._paint_cache.get(cropped)
+            if cached is not None and cached[0] == board_key:
+                return cached[1]
+
+        # Stack the layers in render order, the first set layer owns a pixel.
+        stack, noise = self._stack_layers(layers)
+        top = np.argmax(stack, axis=0)
+        board = self._color_lut[top]
+        board[~stack.any(axis=0)] = 0
+
+        # @ correspond to white noise
+        if self._noise_layer is not None:
+            noise_mask = stack[self._noise_layer] & (top == self._noise_layer)
+            n_noise = np.count_nonzero(noise_mask)
+            if n_noise > 0:
+                board[noise_mask] += noise[:n_noise, None]
+        board = np.clip(board, 0, 255).astype(np.uint8)
+        if self._noise_layer is None:
+            self._paint_cache[cropped] = (board_key, board)
         return board
 
+    def _stack_layers(self, layers):
+        """Stack curtains in render order and draw the white noise for them.
+
+        Noise is drawn for every pixel of the @ layer, painters use it in row
+        major order for the visible ones so both paths consume the rng alike.
+
+        Returns:
+            (K, H, W) boolean np.array and int16 noise (empty if no @ layer).
+        """
+        stack = np.stack([layers[key] for key in self._render_order])
+        if self._noise_layer is None:
+            return stack, self._no_noise
+        n_noise = np.count_nonzero(stack[self._noise_layer])
+        return stack, self._rng.integers(-15,15, n_noise, dtype=np.int16)
+
+    def _paint_and_resize(self, layers, cropped=False):
+        """Paint layers to RGB and upscale them by `resize_scale`.
+
+        Uses the compiled painter when it was built, `_paint_board` and
+        `resize` otherwise.
+        """
+        if _paint is None:
+            return self.resize(self._paint_board(layers, cropped=cropped))
+        stack, noise = self._stack_layers(layers)
+        noise_layer = -1 if self._noise_layer is None else self._noise_layer
+        return _paint.paint_and_resize(stack.view(np.uint8), self._color_lut,
+                                       noise_layer, noise, self.resize_scale)
+
+    def _wait_for_heatmap_write(self):
+        """Wait for the last background heatmap write, re-raising its error if
+        it failed."""
+        future, self._heatmap_future = self._heatmap_future, None
+        if future is not None:
+            future.result()
+
+    def _make_extrinsic_fn(self):
+        """Build the per-step extrinsic reward check for this env's reward spec.
+
+        Returns:
+            callable taking (layers, reward) and returning the reward to use,
+            either `reward` unchanged or the extrinsic reward.
+        """
+        extrinsic_reward = self._extrinsic_reward
+        if extrinsic_reward <= 0.0:
+            return lambda layers, reward: reward
+
+        goal = self._extrinsic_reward_spec[1]
+        if self._extrinsic_coord_based: # extrinsic reward is based on a coordinate
+            def coord_reward(layers, reward):
+                return extrinsic_reward if self._extrinsic_sprite.position == goal else reward
+            return coord_reward
+
+        if goal not in self._state_objects:
+            return lambda layers, reward: reward
+        def char_reward(layers, reward): # extrinsic reward is based on touching an object
+            return extrinsic_reward if layers[goal].any() else reward
+        return char_reward
+
+    @property
+    def visitation_entropy(self):
+        """Entropy of this episode's visitation heatmap (base `visitable_states`),
+        derived in O(1) from the running totals kept by `_update_for_game_step`."""
+        if self._heatmap_total == 0:
+            return 0
+        total = self._heatmap_total
+        return (math.log(total) - self._heatmap_plogp / total) / math.log(self.visitable_states)
+
     def _update_for_game_step(self, observations, reward):
         """Update internal state with data from an environment interaction."""
-        # disentangled one hot state
-        if self._extrinsic_reward > 0.0 and self._extrinsic_coord_based: # extrinsic reward is based on a coordinate
-            if self.current_game.things[self._extrinsic_reward_spec[0]].position == self._extrinsic_reward_spec[1]:
-                reward = self._extrinsic_reward
+        reward = self._extrinsic_fn(observations.layers, reward)
 
+        # disentangled one hot state
         if self.obs_type == 'mask':
-            self._state = []
-            for char in self.state_layer_chars:
-                if char != ' ':
-                    mask = observations.layers[char].astype(float)
-                    if char in self.objects and 1. in mask:
-                        if not self._extrinsic_coord_based and char == self._extrinsic_reward_spec[1]:
-                            reward = self._extrinsic_reward
-                        self.visitation_frequency[char] += 1
-                    self._state.append(mask)
-            self._state = np.array(self._state)
+            # a new array every step, callers may keep earlier observations
+            self._state = np.empty((len(self._state_chars),) + observations.board.shape, np.float32)
+            curtains = tuple([observations.layers[char] for char in self._state_chars])
+            _fill_mask_state(curtains, self._state_is_object, self._state, self._state_touched)
+            self.visitation_frequency[self._state_obj_index[self._state_touched]] += 1
 
         elif self.obs_type == 'rgb':
-            rgb_img = self._paint_board(observations.layers, cropped=True).astype(float)
-            self._state = self.resize(rgb_img)
-            for char in self.state_layer_chars:
-                if char != ' ':
-                    mask = observations.layers[char].astype(float)
-                    if char in self.objects and 1. in mask:
-                        if self._extrinsic_reward > 0.0 and not self._extrinsic_coord_based and char == self._extrinsic_reward_spec[1]:
-                            reward = self._extrinsic_reward
-                        self.visitation_frequency[char] += 1
+            self._state = self._paint_and_resize(observations.layers, cropped=True)
+            for char, i in self._state_object_ids:
+                if observations.layers[char].any():
+                    self.visitation_frequency[i] += 1
 
         # update heatmap metric
         if self.log_heatmaps == True:
-            pr, pc = self.current_game.things['P'].position
-            self.heatmap[pr, pc] += 1
-            self.visitation_entropy = entropy(self.heatmap.flatten(), base=self.visitable_states)
+            pr, pc = self._player.position
+            self._heatmap_plogp += _heatmap_visit(self.heatmap, pr, pc)
+            self._heatmap_total += 1
 
         # update reward
         self._last_reward = reward if reward is not None else \
@@ -406,7 +524,13 @@ class PyColabEnv(gym.Env):
         self.current_game = self.make_game()
         for cropper in self._croppers:
             cropper.set_engine(self.current_game)
-        self._colors = self.make_colors()
+        # subclasses assign their croppers after __init__, so check here
+        self._has_cropper = len(self._croppers) > 0
+        # sprites live as long as the game, so look them up once per episode
+        self._player = self.current_game.things.get('P')
+        if self._extrinsic_reward > 0.0 and self._extrinsic_coord_based:
+            self._extrinsic_sprite = self.current_game.things[self._extrinsic_reward_spec[0]]
+        self._paint_cache = {}
         self.current_game.the_plot.info = {}
         self._game_over = None
         self._last_observations = None
@@ -414,23 +538,27 @@ class PyColabEnv(gym.Env):
 
         observations, reward, _ = self.current_game.its_showtime()
         self._last_uncropped_observations = observations
-        self._empty_uncropped_board = np.zeros_like(self._last_uncropped_observations.board)
-        if len(self._croppers) > 0:
-            observations = [cropper.crop(observations) for cropper in self._croppers][0]
+        # empty boards only back render(), board shapes are fixed so allocate once
+        if self._empty_uncropped_board is None:
+            self._empty_uncropped_board = np.zeros_like(self._last_uncropped_observations.board)
+        assert self._empty_uncropped_board.shape == self._last_uncropped_observations.board.shape
+        if self._has_cropper:
+            observations = self._croppers[0].crop(observations)
             self._last_cropped_observations = observations
-            self._empty_cropped_board = np.zeros_like(self._last_cropped_observations)
+            if self._empty_cropped_board is None:
+                self._empty_cropped_board = np.zeros_like(self._last_cropped_observations.board)
 
         # save and reset metrics
-        for char in self.objects:
-            if self.visitation_frequency[char] > 0:
-                self.num_obj_eps[char] += 1
-        self.visitation_frequency = {char:0 for char in self.objects}
+        self.num_obj_eps += self.visitation_frequency > 0
+        self.visitation_frequency.fill(0)
         if self.log_heatmaps == True and self.episodes % self.heatmap_save_freq == 0:
-            np.save('{}/{}.npy'.format(self.heatmap_path, self.episodes), self.heatmap)
-            heatmap_normed = self.heatmap / np.linalg.norm(self.heatmap)
-            plt.imsave('{}/{}.png'.format(self.heatmap_path, self.episodes), heatmap_normed, cmap='afmhot', vmin=0.0, vmax=1.0)
+            self._wait_for_heatmap_write()
+            # self.heatmap is replaced below (not cleared in place), so the writer can own it
+            self._heatmap_future = _get_heatmap_writer().submit(_write_heatmap, '{}/{}'.format(self.heatmap_path, self.episodes), self.heatmap)
         self.episodes += 1
         self.heatmap = np.zeros(self._last_uncropped_observations.board.shape)
+        self._heatmap_total = 0
+        self._heatmap_plogp = 0.0
         
         # run update
         self._update_for_game_step(observations, reward)
@@ -456,23 +584,22 @@ class PyColabEnv(gym.Env):
         self.current_game.the_plot.info = {}
         observations, reward, _ = self.current_game.play(action)
         self._last_uncropped_observations = observations
-        self._empty_uncropped_board = np.zeros_like(self._last_uncropped_observations.board)
 
         # Crop and update
-        if len(self._croppers) > 0:
-            observations = [cropper.crop(observations) for cropper in self._croppers][0]
+        if self._has_cropper:
+            observations = self._croppers[0].crop(observations)
             self._last_cropped_observations = observations
-            self._empty_cropped_board = np.zeros_like(self._last_cropped_observations.board)
 
         self._update_for_game_step(observations, reward)
         info = self.current_game.the_plot.info
 
-        # Add custom metrics
-        info['visitation_frequency'] = self.visitation_frequency
-        info['first_time_visit'] = self.first_visit_time
+        # Add custom metrics (copies, the collectors may reset the env before
+        # storing this step's info)
+        info['visitation_frequency'] = self.visitation_frequency.copy()
+        info['first_time_visit'] = self.first_visit_time.copy()
         info['visitation_entropy'] = self.visitation_entropy
         info['episodes'] = self.episodes
-        info['num_obj_eps'] = self.num_obj_eps
+        info['num_obj_eps'] = self.num_obj_eps.copy()
 
         # Check the current status of the game.
         reward = self._last_reward
@@ -495,15 +622,13 @@ class PyColabEnv(gym.Env):
             3D np.array (np.uint8) or a `viewer.isopen`.
         """
         img = self._empty_uncropped_board
-        if self._last_uncropped_observations:
-            img = self._last_uncropped_observations.board
-            layers = self._last_uncropped_observations.layers
-            if self._colors:
-                img = self._paint_board(layers, cropped=False)
-            else:
+        if self._last_uncropped_observations and self._colors:
+            img = self._paint_and_resize(self._last_uncropped_observations.layers, cropped=False)
+        else:
+            if self._last_uncropped_observations:
+                img = self._last_uncropped_observations.board
                 assert img is not None, '`board` must not be `None`.'
-
-        img = self.resize(img)
+            img = self.resize(img)
 
         if mode == 'rgb_array':
             return img
@@ -517,10 +642,10 @@ class PyColabEnv(gym.Env):
             return self.viewer.isopen
 
     def resize(self, img):
-        img = _repeat_axes(img, self.resize_scale, axis=[0, 1])
+        img = np.asarray(img).astype(np.uint8, copy=False)
         if len(img.shape) != 3:
-            img = np.repeat(img[..., None], 3, axis=-1)
-        return img.astype(np.uint8)
+            img = np.broadcast_to(img[..., None], img.shape + (3,))
+        return _repeat_axes(img, self.resize_scale, axis=[0, 1])
 
     def seed(self, seed=None):
         """Seeds the environment.
@@ -532,10 +657,12 @@ class PyColabEnv(gym.Env):
             [seed].
         """
         self.np_random, seed = seeding.np_random(seed)
+        self._rng = np.random.default_rng(seed)
         return [seed]
 
     def close(self):
-        """Tears down the renderer."""
+        """Tears down the renderer and finishes any pending heatmap write."""
         if self.viewer:
             self.viewer.close()
             self.viewer = None
+        self._wait_for_heatmap_write()
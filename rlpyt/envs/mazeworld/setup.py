@@ -2,9 +2,21 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from setuptools import setup
+from setuptools import setup, Extension
+
+# The compiled painter is optional, pycolab_env uses numpy when it is missing.
+try:
+    import numpy
+    from Cython.Build import cythonize
+except ImportError:
+    ext_modules = []
+else:
+    ext_modules = cythonize([Extension('mazeworld.envs._paint',
+                                       ['mazeworld/envs/_paint.pyx'],
+                                       include_dirs=[numpy.get_include()])])
 
 setup(name='mazeworld',
       version='0.0.1',
-      install_requires=['gym']
+      install_requires=['gym'],
+      ext_modules=ext_modules
       )
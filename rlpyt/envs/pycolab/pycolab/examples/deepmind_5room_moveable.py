@@ -98,6 +98,8 @@ ROOMS = {
   3 : [[4, 16], [4, 17], [5, 15], [5, 16], [5, 17], [6, 14], [6, 15], [6, 16], [6, 17], [7, 14], [7, 15], [7, 16], [7, 17], [8, 15], [8, 16], [8, 17], [9, 15], [9, 16], [9, 17], [10, 15], [10, 16], [10, 17], [11, 14], [11, 15], [11, 16], [11, 17], [12, 14], [12, 15], [12, 16], [12, 17], [13, 15], [13, 16], [13, 17], [14, 16], [14, 17]],
   4 : [[14, 6], [14, 7], [14, 11], [14, 12], [15, 5], [15, 6], [15, 7], [15, 8], [15, 9], [15, 10], [15, 11], [15, 12], [15, 13], [16, 4], [16, 5], [16, 6], [16, 7], [16, 8], [16, 9], [16, 10], [16, 11], [16, 12], [16, 13], [16, 14], [17, 4], [17, 5], [17, 6], [17, 7], [17, 8], [17, 9], [17, 10], [17, 11], [17, 12], [17, 13], [17, 14]],
 }
+# (N, 2) arrays, so rooms can be sampled from with plain integer indexing
+ROOMS = {room: np.asarray(coords, dtype=np.int32) for room, coords in ROOMS.items()}
 
 def make_game(level):
   """Builds and returns a Better Scrolly Maze game for the selected level."""
@@ -126,7 +128,8 @@ def make_croppers(level):
   """
   return [
       # The player view.
-      cropping.ScrollingCropper(rows=5, cols=5, to_track=['P']),
+      cropping.ScrollingCropper(rows=5, cols=5, to_track=['P'],
+                                scroll_margins=(None, None), pad_char=' '),
   ]
 
 class PlayerSprite(prefab_sprites.MazeWalker):
@@ -165,62 +168,42 @@ class WhiteNoiseObject(prefab_sprites.MazeWalker):
     super(WhiteNoiseObject, self).__init__(corner, position, character, impassable='Pe#')
     # Initialize empty space in surrounding radius.
     self._empty_coords = ROOMS[4]
+    self._n_empty = len(self._empty_coords)
 
   def update(self, actions, board, layers, backdrop, things, the_plot):
     del actions, backdrop  # Unused.
-    self._teleport(self._empty_coords[np.random.choice(len(self._empty_coords))])
+    # _teleport wants a (row, col) pair, not an array row
+    self._teleport(tuple(self._empty_coords[np.random.randint(self._n_empty)].tolist()))
 
 class MoveableObject(prefab_sprites.MazeWalker):
   """Moveable object. Can be pushed by agent."""
 
+  # (object row - player row, object col - player col, player action) of a push
+  # -> (object move, player move that undoes the push, position the object
+  # can't be pushed out of the centre room from)
+  _PUSHES = {(-1, 0, 0): ('_north', '_south', None),
+             (1, 0, 1): ('_south', '_north', (3, 9)),
+             (0, 1, 3): ('_east', '_west', (4, 8)),
+             (0, -1, 2): ('_west', '_east', (4, 10))}
+
   def __init__(self, corner, position, character):
     super(MoveableObject, self).__init__(corner, position, character, impassable='#b')
 
   def update(self, actions, board, layers, backdrop, things, the_plot):
-    mr, mc = self.position
-    pr, pc = things['P'].last_position
-    p_action = things['P'].last_action
-
-    # move up
-    if (mc == pc) and (mr - pr == -1) and (p_action == 0):
-      moved = self._north(board, the_plot)
-      if moved is not None:
-        things['P']._south(board, the_plot)
-
-    # move down
-    elif (mc == pc) and (mr - pr == 1) and (p_action == 1):
-      exiting_room = (self.position == (3, 9))
-      if exiting_room == True:
-        things['P']._north(board, the_plot)
-        self._stay(board, the_plot)
-      else:
-        moved = self._south(board, the_plot)
-        if moved is not None: # obstructed
-          things['P']._north(board, the_plot)
-
-    # move right
-    elif (mc - pc == 1) and (mr == pr) and (p_action == 3):
-      exiting_room = (self.position == (4, 8))
-      if exiting_room == True:
-        things['P']._west(board, the_plot)
-        self._stay(board, the_plot)
-      else:
-        moved = self._east(board, the_plot)
-        if moved is not None: # obstructed
-          things['P']._west(board, the_plot)
-
-    # move left
-    elif (mc - pc == -1) and (mr == pr) and (p_action == 2):
-      exiting_room = (self.position == (4, 10))
-      if exiting_room == True:
-        things['P']._east(board, the_plot)
-        self._stay(board, the_plot)
-      else:
-        moved = self._west(board, the_plot)
-        if moved is not None: # obstructed
-          things['P']._east(board, the_plot)
-
     del actions, backdrop  # Unused.
+    player = things['P']
+    mr, mc = self.position
+    pr, pc = player.last_position
+
+    push = self._PUSHES.get((mr - pr, mc - pc, player.last_action))
+    if push is None:
+      return
+    move, undo, exiting_room = push
+    if self.position == exiting_room:
+      getattr(player, undo)(board, the_plot)
+      self._stay(board, the_plot)
+    elif getattr(self, move)(board, the_plot) is not None: # obstructed
+      getattr(player, undo)(board, the_plot)
 
 
 def main(argv=()):
@@ -1,5 +1,4 @@
 import os
-from PIL import Image
 import numpy as np
 import torch
 from torch import nn
@@ -8,7 +7,14 @@ from rlpyt.utils.tensor import infer_leading_dims, restore_leading_dims, valid_m
 from rlpyt.utils.averages import RunningMeanStd, RewardForwardFilter
 from rlpyt.models.utils import Flatten
 from rlpyt.models.curiosity.encoders import BurdaHead, MazeHead, UniverseHead
-import cv2
+
+
+def _ortho_init(model):
+    """Orthogonal weights (gain sqrt(2)) and zero biases for the conv/linear layers."""
+    for layer in model:
+        if isinstance(layer, (nn.Conv2d, nn.Linear)):
+            nn.init.orthogonal_(layer.weight, np.sqrt(2))
+            layer.bias.data.zero_()
 
 
 class RND(nn.Module):
@@ -22,7 +28,8 @@ class RND(nn.Module):
             prediction_beta=1.0,
             drop_probability=1.0,
             gamma=0.99,
-            device='cpu'
+            device='cpu',
+            jit_models=False
             ):
         super(RND, self).__init__()
 
@@ -38,6 +45,13 @@ class RND(nn.Module):
         if obs_stats is not None:
             self.obs_rms.mean[0] = obs_stats[0]
             self.obs_rms.var[0] = obs_stats[1]**2
+        # copies of obs_rms (mean, 1/std) on the device forward runs on, made
+        # there on first use and refreshed whenever obs_rms is updated
+        self._obs_mean = None
+        self._obs_inv_std = None
+        # on GPU, refreshes go through pinned host memory and don't block
+        self._obs_stats_host = None
+        self._obs_stats_copied = None
         self.rew_rms = RunningMeanStd()
         self.rew_rff = RewardForwardFilter(gamma)
         self.feature_size = 512
@@ -71,10 +85,7 @@ class RND(nn.Module):
                                             nn.Linear(self.feature_size, self.feature_size)
                                             )
 
-        for param in self.forward_model:
-            if isinstance(param, nn.Conv2d) or isinstance(param, nn.Linear):
-                nn.init.orthogonal_(param.weight, np.sqrt(2))
-                param.bias.data.zero_()
+        _ortho_init(self.forward_model)
 
         # Fixed weight target model
         self.target_model = nn.Sequential(
@@ -100,90 +111,140 @@ class RND(nn.Module):
                                             nn.Linear(self.conv_feature_size, self.feature_size)
                                         )
 
-        for param in self.target_model:
-            if isinstance(param, nn.Conv2d) or isinstance(param, nn.Linear):
-                nn.init.orthogonal_(param.weight, np.sqrt(2))
-                param.bias.data.zero_()
-        for param in self.target_model.parameters():
-            param.requires_grad = False
-
+        _ortho_init(self.target_model)
+        self.target_model.requires_grad_(False)
+
+        if jit_models:
+            # static graphs, TorchScript removes the eager per-op dispatch
+            self.forward_model = torch.jit.script(self.forward_model)
+            self.target_model = torch.jit.script(self.target_model)
+        self._target_stream = None
+        # eager target net as (trunk layers, last Linear) for _target_phi, in a
+        # tuple so the layers aren't registered a second time
+        self._target_split = None if jit_models else (tuple(self.target_model)[:-1], self.target_model[-1])
+        self._phi_buf = None
+
+
+    def _sync_obs_stats(self, device):
+        """Copy the running observation mean and 1/std into their tensors on `device`."""
+        mean = torch.from_numpy(self.obs_rms.mean)
+        inv_std = torch.from_numpy(1.0 / (np.sqrt(self.obs_rms.var)+1e-10))
+        if self._obs_mean is None or self._obs_mean.device != device:
+            # first use on this device, after the module has been moved there
+            self._obs_mean = mean.to(device, torch.float32, copy=True)
+            self._obs_inv_std = inv_std.to(device, torch.float32, copy=True)
+            return
+        if device.type != 'cuda':
+            self._obs_mean.copy_(mean)
+            self._obs_inv_std.copy_(inv_std)
+            return
+
+        # created lazily, like the target stream, so the model stays picklable
+        if self._obs_stats_host is None:
+            self._obs_stats_host = torch.empty((2,) + mean.shape).pin_memory()
+            self._obs_stats_copied = torch.cuda.Event()
+        # the last async copy has to be done reading the staging buffer first
+        self._obs_stats_copied.synchronize()
+        self._obs_stats_host[0].copy_(mean)
+        self._obs_stats_host[1].copy_(inv_std)
+        self._obs_mean.copy_(self._obs_stats_host[0], non_blocking=True)
+        self._obs_inv_std.copy_(self._obs_stats_host[1], non_blocking=True)
+        self._obs_stats_copied.record()
+
+    def _target_phi(self, norm_obs):
+        """Target net output. The last linear layer writes into a buffer that is
+        reused while the batch size stays the same, so the returned phi is
+        overwritten by the next call."""
+        if self._target_split is None:
+            return self.target_model(norm_obs)
+        trunk, head = self._target_split
+        features = norm_obs
+        for layer in trunk:
+            features = layer(features)
+        if self._phi_buf is None or self._phi_buf.shape[0] != features.shape[0] \
+                or self._phi_buf.device != features.device:
+            self._phi_buf = features.new_empty((features.shape[0], self.feature_size))
+        return torch.addmm(head.bias, features, head.weight.t(), out=self._phi_buf)
+
+    def _embed(self, norm_obs):
+        """Run the target and predictor nets on the same batch. On GPU the
+        target runs on a side stream so the two nets can overlap.
+
+        The returned phi is the target buffer from `_target_phi`, callers have to
+        be done with it before the next call."""
+        if not norm_obs.is_cuda:
+            with torch.no_grad():
+                phi = self._target_phi(norm_obs)
+            return phi, self.forward_model(norm_obs)
+
+        # created lazily, streams can't be pickled along with the model
+        if self._target_stream is None:
+            self._target_stream = torch.cuda.Stream(device=norm_obs.device)
+        current = torch.cuda.current_stream(norm_obs.device)
+        self._target_stream.wait_stream(current)
+        with torch.cuda.stream(self._target_stream), torch.no_grad():
+            phi = self._target_phi(norm_obs)
+        predicted_phi = self.forward_model(norm_obs)
+        current.wait_stream(self._target_stream)
+        # tell the caching allocator about the cross-stream uses
+        norm_obs.record_stream(self._target_stream)
+        phi.record_stream(current)
+        return phi, predicted_phi
 
     def forward(self, obs, not_done=None):
 
-        # in case of frame stacking
-        obs = obs[:,:,-1,:,:]
-        obs = obs.unsqueeze(2)
-        obs_cpu = obs.clone().cpu().data.numpy()
-
-        # img = np.squeeze(obs.data.numpy()[0][0])
-        # mean = np.squeeze(self.obs_rms.mean)
-        # var = np.squeeze(self.obs_rms.var)
-        # std = np.squeeze(np.sqrt(self.obs_rms.var))
-        # cv2.imwrite('images/original.png', img)
-        # cv2.imwrite('images/mean.png', mean)
-        # cv2.imwrite('images/var.png', var)
-        # cv2.imwrite('images/std.png', std)
-        # cv2.imwrite('images/whitened.png', img-mean)
-        # cv2.imwrite('images/final.png', (img-mean)/std)
-        # cv2.imwrite('images/scaled_final.png', ((img-mean)/std)*111)
-        #print("Final", np.min(((img-mean)/std).ravel()), np.mean(((img-mean)/std).ravel()), np.max(((img-mean)/std).ravel()))
-        # print("#"*100 + "\n")
+        # in case of frame stacking, keep only the newest frame: (T, B, 1, h, w)
+        obs = obs[:,:,-1:,:,:]
 
         # Infer (presence of) leading dimensions: [T,B], [B], or [].
         # lead_dim is just number of leading dimensions: e.g. [T, B] = 2 or [] = 0.
         lead_dim, T, B, img_shape = infer_leading_dims(obs, 3)
-        
-        if self.device == torch.device('cuda:0'):
-            obs_mean = torch.from_numpy(self.obs_rms.mean).float().cuda()
-            obs_var = torch.from_numpy(self.obs_rms.var).float().cuda()
-        else:
-            obs_mean = torch.from_numpy(self.obs_rms.mean).float()
-            obs_var = torch.from_numpy(self.obs_rms.var).float()
-        norm_obs = (obs.clone().float() - obs_mean) / (torch.sqrt(obs_var)+1e-10)
-        norm_obs = torch.clamp(norm_obs, min=-5, max=5).float()
-
-        # prediction target
-        phi = self.target_model(norm_obs.clone().detach().view(T * B, *img_shape)).view(T, B, -1)
-
-        # make prediction
-        predicted_phi = self.forward_model(norm_obs.detach().view(T * B, *img_shape)).view(T, B, -1)
+
+        if self._obs_mean is None or self._obs_mean.device != obs.device:
+            self._sync_obs_stats(obs.device)
+
+        # the target is fixed and the predictor only trains its own weights,
+        # so nothing upstream of either net needs a graph
+        with torch.no_grad():
+            norm_obs = (obs.float() - self._obs_mean) * self._obs_inv_std
+            norm_obs = torch.clamp(norm_obs, min=-5, max=5)
+
+        # prediction target and prediction, phi is only valid until the next forward
+        phi, predicted_phi = self._embed(norm_obs.detach().view(T * B, *img_shape))
+        phi, predicted_phi = phi.view(T, B, -1), predicted_phi.view(T, B, -1)
 
         # update statistics
         if not_done is not None:
-            valid_obs = np.reshape(obs_cpu[np.where(not_done==1)[:2]], (-1, self.c, self.h, self.w))
+            obs_cpu = obs.cpu().data.numpy()
+            valid_obs = obs_cpu[not_done == 1] # (T, B, c, h, w) -> (N, c, h, w)
             self.obs_rms.update(valid_obs)
+            self._sync_obs_stats(obs.device)
 
         return phi, predicted_phi, T
 
     def compute_bonus(self, next_observation, done):
-        done = done.cpu().data.numpy()
-        not_done = np.abs(done-1)
+        # the mask stays on device for the rewards, the host copy feeds the running stats
+        not_done_t = 1.0 - done.float()
+        not_done = not_done_t.cpu().data.numpy()
         phi, predicted_phi, T = self.forward(next_observation, not_done=not_done)
-        rewards = nn.functional.mse_loss(predicted_phi, phi.detach(), reduction='none').sum(-1)/self.feature_size
+        rewards = nn.functional.mse_loss(predicted_phi, phi.detach(), reduction='none').mean(-1)
 
         # update running mean
-        rewards_cpu = rewards.clone().cpu().data.numpy()
-        total_rew_per_env = np.array([self.rew_rff.update(rewards_cpu[i], not_done=not_done[i]) for i in range(T)])
+        rewards_cpu = rewards.cpu().data.numpy()
+        total_rew_per_env = self.rew_rff.batch_update(rewards_cpu, not_done)
         self.rew_rms.update_from_moments(np.mean(total_rew_per_env), np.var(total_rew_per_env), np.sum(not_done))
 
         # normalize rewards
-        if self.device == torch.device('cuda:0'):
-            rew_var = torch.from_numpy(np.array(self.rew_rms.var)).float().cuda()
-            not_done = torch.from_numpy(not_done).float().cuda()
-        else:
-            rew_var = torch.from_numpy(np.array(self.rew_rms.var)).float()
-            not_done = torch.from_numpy(not_done).float()
-        rewards /= torch.sqrt(rew_var)
+        rewards /= float(np.sqrt(self.rew_rms.var))
 
         # apply done mask
-        rewards *= not_done
+        rewards *= not_done_t
         return self.prediction_beta * rewards
 
     def compute_loss(self, next_observations, valid):
         phi, predicted_phi, _ = self.forward(next_observations, not_done=None)
-        forward_loss = nn.functional.mse_loss(predicted_phi, phi.detach(), reduction='none').sum(-1)/self.feature_size
-        mask = torch.rand(forward_loss.shape)
-        mask = 1.0 - (mask > self.drop_probability).float().to(self.device)
+        forward_loss = nn.functional.mse_loss(predicted_phi, phi.detach(), reduction='none').mean(-1)
+        mask = (torch.rand(forward_loss.shape, device=forward_loss.device) <= self.drop_probability).float()
         net_mask = mask * valid
         forward_loss = torch.sum(forward_loss * net_mask.detach()) / torch.sum(net_mask.detach())
         return forward_loss
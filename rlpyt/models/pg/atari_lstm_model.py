@@ -77,7 +77,8 @@ class AtariLstmModel(torch.nn.Module):
                                            prediction_beta=curiosity_kwargs['prediction_beta'],
                                            drop_probability=curiosity_kwargs['drop_probability'],
                                            gamma=curiosity_kwargs['gamma'],
-                                           device=curiosity_kwargs['device'])
+                                           device=curiosity_kwargs['device'],
+                                           jit_models=curiosity_kwargs['jit_models'])
             
             if curiosity_kwargs['feature_encoding'] == 'idf':
                 self.conv = UniverseHead(image_shape=image_shape,
@@ -8,6 +8,11 @@ from copy import deepcopy
 
 from rlpyt.utils.misc import wrap_print
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 class RunningMeanStd(object):
     # https://en.wikipedia.org/wiki/Algorithms_for_calculating_variance#Parallel_algorithm
     def __init__(self, epsilon=1e-4, shape=()):
@@ -37,6 +42,30 @@ class RunningMeanStd(object):
         self.var = new_var
         self.count = new_count
 
+if njit is not None:
+    @njit(cache=True)
+    def rff_scan(rews, not_done, gamma, rewems, out):
+        '''
+        Runs the forward filter over rews[T, B] in place on rewems[B], writing
+        the filtered rewards into out[T, B]. Envs with not_done != 1 keep their
+        filtered reward.
+        '''
+        for t in range(rews.shape[0]):
+            for b in range(rews.shape[1]):
+                if not_done[t, b] == 1.0:
+                    rewems[b] = rewems[b] * gamma + rews[t, b]
+                out[t, b] = rewems[b]
+else:
+    def rff_scan(rews, not_done, gamma, rewems, out):
+        # done envs keep their filtered reward: decay by 1 and add nothing
+        mask = not_done == 1.0
+        decay = np.where(mask, gamma, 1.0).astype(rews.dtype)
+        rews = np.where(mask, rews, 0.0).astype(rews.dtype)
+        for t in range(len(rews)):
+            rewems *= decay[t]
+            rewems += rews[t]
+            out[t] = rewems
+
 class RewardForwardFilter(object):
     def __init__(self, gamma):
         self.rewems = None
@@ -58,6 +87,23 @@ class RewardForwardFilter(object):
                 self.rewems[mask] = self.rewems[mask] * self.gamma + rews[mask]
             return deepcopy(self.rewems)
 
+    def batch_update(self, rews, not_done):
+        '''
+        Equivalent to calling update(rews[t], not_done=not_done[t]) for each t,
+        returns the (T, B) array of filtered rewards.
+        '''
+        out = np.empty_like(rews)
+        if len(rews) == 0:
+            return out
+        start = 0
+        if self.rewems is None:
+            self.rewems = rews[0].copy()
+            out[0] = self.rewems
+            start = 1
+        # gamma in the rewards' dtype, so float32 rewards are filtered in float32
+        rff_scan(rews[start:], not_done[start:], rews.dtype.type(self.gamma), self.rewems, out[start:])
+        return out
+
 def generate_observation_stats(env, nsteps=10000):
     '''
     Steps through the environment randomly and produces an observation mean and standard deviation. 
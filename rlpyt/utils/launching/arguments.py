@@ -98,6 +98,7 @@ def get_args(args_in=sys.argv[1:]):
         parser.add_argument('-feature_encoding', default='none', type=str, choices=['none'], help='Which feature encoding method to use with RND.')
         parser.add_argument('-prediction_beta', default=1.0, type=float, help='Scalar multiplier applied to the prediction error to generate the intrinsic reward. Environment dependent.')
         parser.add_argument('-drop_probability', default=1.0, type=float, help='Decimal percent of experience to drop when training the predictor model.')
+        parser.add_argument('-jit_models', action='store_true', help='Whether or not to compile the target and predictor models with TorchScript.')
     elif curiosity_alg == 'none':
         parser.add_argument('-feature_encoding', default='none', type=str, choices=['none'], help='Which feature encoding method to use with your policy.')
 